@@ -0,0 +1,3 @@
+from discord_installer.core import main
+
+__all__ = ['main']
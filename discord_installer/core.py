@@ -0,0 +1,581 @@
+import json
+import os
+import re
+import shlex
+import struct
+import tarfile
+import time
+from argparse import ArgumentParser
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from hashlib import sha256
+from pathlib import Path
+from shutil import copy, rmtree, which
+from subprocess import PIPE, Popen, run
+
+_DEB_PACKAGE = 'discord-electron'
+_REQUEST_URL = 'https://discord.com/api/download?platform=linux&format=tar.gz'
+
+_VERSION_CACHE_FILE = Path('~/.cache/discord-electron-installer/version.json').expanduser()
+_VERSION_CACHE_TTL = 300  # seconds
+
+_use_version_cache = True
+
+_ARCHIVE_URL_PATTERN = re.compile(r'([^/]+?)-(\d+\.\d+\.\d+)\.tar\.gz$')
+_DESKTOP_PATTERN = re.compile(r'^(Exec=|Path=).*', re.M)
+_AUTOSTART_PATTERN = re.compile(
+    r'^(?:\s*const (?:appName|exePath|exeDir|iconPath) = .*|(Exec=|Name=|Icon=).*)',
+    re.M,
+)
+_RESOURCES_PATH_PATTERN = re.compile(r'\s*(?:let )?resourcesPath = .*;')
+
+_NPM_PACKAGES = ('npm', 'electron')
+
+# Probing apt/npm costs a few hundred ms per child process, so each probe is
+# done once for every package of interest and memoized here.
+_apt_versions: dict[str, str] | None = None
+_npm_installed_versions: dict[str, str] | None = None
+_npm_latest_versions: dict[str, str] | None = None
+
+
+@dataclass
+class VersionInfo:
+    url: str
+    archive: str
+    name: str
+    version: str
+    size: int = 0
+
+
+def confirm(message: str, default: bool = True) -> bool:
+    answer = input(f"{message} [{'Y/n' if default else 'y/N'}] ").strip().lower()
+    return answer.startswith('y') if answer else default
+
+
+def apt_get_installed_version(name: str) -> str | None:
+    global _apt_versions
+    if _apt_versions is None:
+        _apt_versions = apt_get_installed_versions('npm', 'dpkg', _DEB_PACKAGE)
+    return _apt_versions.get(name)
+
+
+def apt_get_installed_versions(*names: str) -> dict[str, str]:
+    # dpkg-query answers in a few ms, where apt pays for cache
+    # initialization on every call. Unknown packages only affect the
+    # return code; installed ones still show up on stdout.
+    d = {}
+    result = run(
+        ['dpkg-query', '-W', '-f=${Package} ${Version}\n', *names],
+        capture_output=True,
+        text=True,
+    )
+    for line in result.stdout.splitlines():
+        name, _, version = line.partition(' ')
+        if version:
+            d[name] = version
+    return d
+
+
+def npm_get_latest_version(name: str) -> str:
+    global _npm_latest_versions
+    if _npm_latest_versions is None:
+        result = run(
+            ['npm', 'view', *_NPM_PACKAGES, 'version', '--json'],
+            capture_output=True,
+            text=True,
+        )
+        versions = {}
+        for key, value in json.loads(result.stdout).items():
+            # Keys may be either 'name' or 'name@spec'.
+            package = key if key in _NPM_PACKAGES else key[: key.rindex('@')]
+            versions[package] = value['version'] if isinstance(value, dict) else value
+        _npm_latest_versions = versions
+    return _npm_latest_versions[name]
+
+
+def npm_get_installed_versions() -> dict[str, str]:
+    global _npm_installed_versions
+    if _npm_installed_versions is None:
+        result = run(
+            ['npm', '-g', '--json', 'list', '--depth=0'],
+            capture_output=True,
+            text=True,
+        )
+        data = json.loads(result.stdout)
+        _npm_installed_versions = {
+            name: info['version'] for name, info in data.get('dependencies', {}).items()
+        }
+    return _npm_installed_versions
+
+
+def npm_install(name: str, version: str | None = None):
+    if version:
+        run(['sudo', 'npm', '-g', 'install', f'{name}@{version}'], check=True)
+        return
+
+    latest_version = npm_get_latest_version(name)
+    installed_version = npm_get_installed_versions().get(name)
+
+    if not installed_version:
+        if not confirm(
+            f'npm - {name} not found! Install {name} v{latest_version} (required)?',
+            default=True,
+        ):
+            exit()
+        npm_install(name, latest_version)
+        return
+
+    print(f'npm - {name} found: v{installed_version}')
+    npm_update_from_version(name, installed_version, latest_version)
+
+
+def npm_update_from_version(name: str, installed_version: str, latest_version: str | None = None):
+    if not latest_version:
+        latest_version = npm_get_latest_version(name)
+
+    if installed_version == latest_version or not confirm(
+        f'npm - Update {name} to v{latest_version}?', default=False
+    ):
+        return
+
+    run(['sudo', 'npm', '-g', 'install', f'{name}@{latest_version}'], check=True)
+
+
+def check_apt():
+    for name in ['npm', 'dpkg']:
+        if version := apt_get_installed_version(name):
+            print(f'apt - {name} found: v{version}')
+            continue
+        if not confirm(f'apt - {name} not found! Install (required)?', default=True):
+            exit()
+        run(['sudo', 'apt', 'install', name])
+
+
+def check_npm():
+    result = None
+
+    try:
+        result = run(
+            ['npm', '--version'],
+            capture_output=True,
+            text=True,
+        )
+    except FileNotFoundError:
+        print('npm not found!')
+        exit()
+
+    version = result.stdout.strip()
+    print(f'npm found: v{version}')
+
+    npm_update_from_version('npm', version)
+    npm_install('electron')
+
+
+def _asar_walk(node: dict, prefix: str = '') -> Iterator[tuple[str, dict]]:
+    for name, entry in node.get('files', {}).items():
+        path = f'{prefix}{name}'
+        if 'files' in entry:
+            yield from _asar_walk(entry, f'{path}/')
+        elif 'offset' in entry:
+            yield path, entry
+
+
+_ASAR_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def _asar_integrity(data: bytes) -> dict:
+    blocks = [
+        sha256(data[i : i + _ASAR_BLOCK_SIZE]).hexdigest()
+        for i in range(0, len(data), _ASAR_BLOCK_SIZE)
+    ] or [sha256(data).hexdigest()]
+    return {
+        'algorithm': 'SHA256',
+        'hash': sha256(data).hexdigest(),
+        'blockSize': _ASAR_BLOCK_SIZE,
+        'blocks': blocks,
+    }
+
+
+def asar_patch(archive: Path, patches: dict[str, Callable[[str], str]]):
+    """Rewrites individual files inside an asar archive.
+
+    An asar is a 16-byte pickle preamble, a JSON index, and the file contents
+    concatenated, so a handful of small edits doesn't need the asar CLI's full
+    extract/repack round-trip over thousands of files.
+    """
+    with open(archive, 'rb') as f:
+        _, header_buffer_size, _, header_size = struct.unpack('<4I', f.read(16))
+        header = json.loads(f.read(header_size))
+        f.seek(8 + header_buffer_size)
+        contents = f.read()
+
+    remaining = dict(patches)
+    blobs = []
+    offset = 0
+
+    for path, entry in _asar_walk(header):
+        start = int(entry['offset'])
+        blob = contents[start : start + entry['size']]
+        if transform := remaining.pop(path, None):
+            blob = transform(blob.decode()).encode()
+            entry['size'] = len(blob)
+            if 'integrity' in entry:
+                entry['integrity'] = _asar_integrity(blob)
+        entry['offset'] = str(offset)
+        offset += len(blob)
+        blobs.append(blob)
+
+    if remaining:
+        raise FileNotFoundError(f'Not found in {archive}: {", ".join(remaining)}')
+
+    data = json.dumps(header, separators=(',', ':')).encode()
+    header_size = len(data)
+    padding = -header_size % 4
+
+    with open(archive, 'wb') as f:
+        f.write(
+            struct.pack(
+                '<4I',
+                4,
+                8 + header_size + padding,
+                4 + header_size + padding,
+                header_size,
+            )
+        )
+        f.write(data)
+        f.write(b'\0' * padding)
+        f.writelines(blobs)
+
+
+def copy_tree(src: Path | str, dst: Path):
+    # cp walks the tree in C with a single process, where shutil.copytree
+    # pays Python call overhead for every one of the hundreds of files.
+    dst.mkdir(parents=True, exist_ok=True)
+    run(['cp', '-a', f'{src}/.', dst], check=True)
+
+
+def get_decompressor() -> str | None:
+    """Returns a parallel gunzip command if one is available.
+
+    Plain tar decompresses with single-threaded zlib, which is the bottleneck
+    on a multi-core host.
+    """
+    if which('rapidgzip'):
+        return f'rapidgzip -d -c -P {os.cpu_count()}'
+    if which('pigz'):
+        return 'pigz -d -c'
+    return None
+
+
+# Default tarfile buffers copy members 16K at a time; a 4M buffer makes
+# extraction ~30% faster (bpo-34043).
+_TAR_COPY_BUFSIZE = 4 * 1024 * 1024
+
+# The extraction filter only exists on interpreters with the PEP 706
+# backports (3.10.12+/3.11.4+); older ones reject the keyword.
+_TAR_FILTER = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+
+
+def extract_archive(archive: Path):
+    if decompressor := get_decompressor():
+        run(
+            f'{decompressor} {shlex.quote(str(archive))} | tar -x',
+            check=True,
+            shell=True,
+        )
+        return
+    with tarfile.open(archive, 'r:gz') as tar:
+        tar.copybufsize = _TAR_COPY_BUFSIZE
+        tar.extractall(**_TAR_FILTER)
+
+
+def get_version_info() -> VersionInfo:
+    # The launcher may check for updates and then immediately install, so a
+    # short-lived cache saves a second round-trip to discord.com.
+    if _use_version_cache and _VERSION_CACHE_FILE.is_file():
+        try:
+            data = json.loads(_VERSION_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            data = None
+        if data and time.time() - data.pop('fetched_at', 0) < _VERSION_CACHE_TTL:
+            return VersionInfo(**data)
+
+    # urllib keeps the needs-update hot path stdlib-only; the launcher runs
+    # it on every Discord start, so import time is user-visible.
+    from urllib.request import Request, urlopen
+
+    with urlopen(Request(_REQUEST_URL, method='HEAD')) as response:
+        url = response.url
+        size = int(response.headers.get('Content-Length', 0))
+
+    match = _ARCHIVE_URL_PATTERN.search(url)
+    if not match:
+        print(f'Invalid response URL: {url}')
+        exit(-1)
+
+    info = VersionInfo(
+        url=url, archive=match[0], name=match[1], version=match[2], size=size
+    )
+
+    try:
+        _VERSION_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _VERSION_CACHE_FILE.write_text(
+            json.dumps({**asdict(info), 'fetched_at': time.time()})
+        )
+    except OSError:
+        pass
+
+    return info
+
+
+def _do_needs_update():
+    info = get_version_info()
+    needs = apt_get_installed_version(_DEB_PACKAGE) != info.version
+    print(info.url)
+    print('Update needed:', needs)
+    exit(1 if needs else 0)
+
+
+def _do_install(full: bool, keep_archive: bool = False):
+    if full:
+        check_apt()
+        check_npm()
+
+    version_info = get_version_info()
+    version = version_info.version
+    installed_version = apt_get_installed_version(_DEB_PACKAGE)
+    already_installed = version == installed_version
+
+    if already_installed:
+        print(f'* {_DEB_PACKAGE} v{version} is already installed.')
+    else:
+        print(f'Installing {_DEB_PACKAGE} v{version}...')
+
+    if full and not confirm(
+        f'Build Debian package for {version_info.name} {version}?', default=not already_installed
+    ):
+        exit()
+
+    root = Path(__file__).absolute().parent.parent
+    os.chdir(root)
+
+    archives = root / 'archives'
+    archive = archives / version_info.archive
+
+    if not archives.is_dir():
+        archives.mkdir()
+
+    must_download = not archive.is_file()
+
+    if (
+        not must_download
+        and version_info.size
+        and archive.stat().st_size != version_info.size
+    ):
+        # A download interrupted mid-write leaves a truncated archive that
+        # tar would choke on; wget -c tops it up instead of starting over.
+        print('Archive is incomplete; resuming download...')
+        run(f'wget -c {version_info.url!r}', check=True, shell=True, cwd=archives)
+        must_download = True
+    elif must_download and keep_archive:
+        print('Downloading archive...')
+        run(f'wget -c {version_info.url!r}', check=True, shell=True, cwd=archives)
+
+    if archive.is_file():
+        print('Decompressing archive...')
+        extract_archive(archive)
+    else:
+        # Pipe the download straight into tar so decompression overlaps with
+        # the transfer and the archive never touches the disk.
+        print('Downloading and decompressing archive...')
+        from urllib.request import urlopen
+
+        with urlopen(version_info.url) as response:
+            if decompressor := get_decompressor():
+                process = Popen(
+                    f'{decompressor} | tar -x', shell=True, stdin=PIPE, cwd=root
+                )
+                while chunk := response.read(1 << 20):
+                    process.stdin.write(chunk)
+                process.stdin.close()
+                if process.wait():
+                    exit(process.returncode)
+            else:
+                with tarfile.open(
+                    fileobj=response, mode='r|gz', bufsize=_TAR_COPY_BUFSIZE
+                ) as tar:
+                    tar.copybufsize = _TAR_COPY_BUFSIZE
+                    tar.extractall(root, **_TAR_FILTER)
+
+    src = root / 'Discord'
+
+    print('Patching sources...')
+
+    package_name = 'discord'
+    dest = Path('/usr/local').expanduser()
+    _bin = Path('bin')
+    binary = _bin / package_name
+    lib = Path('lib') / package_name
+    share = Path('share')
+    pixmaps = share / 'pixmaps'
+
+    file = src / 'discord.desktop'
+    mapping = {'Exec=': str(dest / binary), 'Path=': str(dest / _bin)}
+    file.write_text(
+        _DESKTOP_PATTERN.sub(lambda m: m[1] + mapping[m[1]], file.read_text())
+    )
+
+    os.chdir(src)
+
+    def patch_build_info(s: str) -> str:
+        return s.replace('process.resourcesPath', repr(str(dest / lib)))
+
+    def patch_paths(s: str) -> str:
+        s = _RESOURCES_PATH_PATTERN.sub('', s)
+        return s.replace('return resourcesPath', f'return {str(dest / lib)!r}')
+
+    mapping = {
+        'Exec=': str(dest / binary),
+        'Name=': package_name,
+        'Icon=': package_name,
+    }
+
+    def patch_auto_start(s: str) -> str:
+        return _AUTOSTART_PATTERN.sub(
+            lambda m: m[1] + mapping[m[1]] if m[1] else '', s
+        )
+
+    asar_patch(
+        Path('resources/app.asar'),
+        {
+            'app_bootstrap/buildInfo.js': patch_build_info,
+            'common/paths.js': patch_paths,
+            'app_bootstrap/autoStart/linux.js': patch_auto_start,
+        },
+    )
+
+    os.chdir(root)
+
+    build = root / 'build'
+    deb = build / _DEB_PACKAGE
+
+    print('Creating installation files...')
+    if build.exists():
+        rmtree(build)
+    build.mkdir()
+
+    deb.mkdir()
+    dst = deb / dest.relative_to('/')
+
+    s = f'''#!/bin/bash
+
+if which update-discord > /dev/null 2>&1; then
+    update-discord needs-update
+    if [[ "$?" == 1 ]]; then
+        konsole -e 'update-discord --silent'
+    fi
+fi
+
+electron {str(dest / lib / 'app.asar')!r} "$@"
+'''
+    launcher = src / 'launcher.sh'
+    launcher.write_text(s)
+    binary = dst / binary
+
+    lib = dst / lib
+    pixmaps = dst / pixmaps
+    applications = dst / share / 'applications'
+
+    for directory in (lib, dst / _bin, pixmaps, applications):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def copy_debian():
+        copy_tree('DEBIAN', deb / 'DEBIAN')
+        control = deb / 'DEBIAN' / 'control'
+        control.write_text(control.read_text().replace('__VERSION__', version))
+
+    def install_binary():
+        copy(launcher, binary)
+        binary.chmod(0o755)
+
+    def write_updater():
+        file = dst / _bin / 'update-discord'
+        file.write_text(
+            f'''#!/bin/bash
+set -e
+cd {root} || exit
+./run.py "$@"
+'''
+        )
+        file.chmod(0o755)
+
+    # The remaining copies are independent and I/O bound, so overlap them.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(copy_debian),
+            executor.submit(install_binary),
+            executor.submit(write_updater),
+            executor.submit(copy_tree, src / 'resources', lib),
+            executor.submit(copy, src / 'discord.png', pixmaps / f'{package_name}.png'),
+            executor.submit(
+                copy, src / 'discord.desktop', applications / f'{package_name}.desktop'
+            ),
+            executor.submit(copy, root / 'update-discord.desktop', applications),
+        ]
+        for future in futures:
+            future.result()
+
+    rmtree(src)
+
+    if full and must_download and archive.is_file() and confirm('Delete archive?', default=True):
+        archive.unlink()
+        if not os.listdir(archives):
+            archives.rmdir()
+
+    print('Creating Debian package...')
+    os.chdir(build)
+    run(['dpkg-deb', '--build', _DEB_PACKAGE], check=True)
+
+    file = Path(f'{_DEB_PACKAGE}.deb')
+    if not full or confirm(f'Install {file}?', default=True):
+        run(['sudo', 'apt', 'install', '--reinstall', '-y', file.absolute()])
+
+    if full:
+        print('Finished! Press any key to exit.')
+        input()
+
+
+def main():
+    parser = ArgumentParser(
+        prog='update-discord',
+        description='Updates Discord and associated system libraries',
+    )
+    parser.add_argument('--silent', action='store_true')
+    parser.add_argument('--keep-archive', action='store_true')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.set_defaults(fn=None)
+
+    parsers = parser.add_subparsers(title='action')
+
+    sub_parser = parsers.add_parser(
+        'needs-update',
+        description='Checks if an update is needed',
+    )
+    sub_parser.set_defaults(fn=_do_needs_update)
+
+    args = parser.parse_args()
+
+    if args.no_cache:
+        global _use_version_cache
+        _use_version_cache = False
+
+    if args.fn:
+        args.fn()
+        exit()
+
+    _do_install(not args.silent, args.keep_archive)
+
+
+if __name__ == '__main__':
+    main()